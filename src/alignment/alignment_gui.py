@@ -5,62 +5,52 @@ import tkinter as tk
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from sklearn.decomposition import PCA
-from scipy.interpolate import Rbf
-
-# ========= Loaders ========= #
-def load_keyframes(path):
-    kf = []
-    with open(path, 'r') as f:
-        for line in f:
-            if line.strip() == "" or line.startswith("#"):
-                continue
-            parts = line.strip().split()
-            tx, ty, tz = float(parts[1]), float(parts[2]), float(parts[3])
-            kf.append([tx, ty, tz])
-    return np.array(kf)
-
-def load_map_points(path):
-    points = []
-    with open(path, 'r') as f:
-        for line in f:
-            if line.strip() == "" or line.startswith("pos_x"):
-                continue
-            parts = line.strip().replace(",", " ").split()
-            x, y, z = float(parts[0]), float(parts[1]), float(parts[2])
-            points.append([x, y, z])
-    return np.array(points)
-
-def project_to_plane(trajectory, pointcloud):
-    all_points = np.vstack([trajectory, pointcloud])
-    pca = PCA(n_components=2)
-    pca.fit(all_points)
-    traj_2d = pca.transform(trajectory)
-    pc_2d = pca.transform(pointcloud)
-    traj_2d[:, 1] *= -1
-    pc_2d[:, 1] *= -1
-    return traj_2d, pc_2d
-
-class PointCloudAligner:
+from io_utils import load_keyframes, load_map_points, project_to_plane
+from tps import fit_tps, eval_tps
+from gui_utils import DeferredRedrawMixin
+
+# Upper bound on map points drawn in the GUI
+MAX_DISPLAY_POINTS = 20000
+
+def set_point(artist, point):
+    if point is None:
+        artist.set_data([], [])
+    else:
+        artist.set_data([point[0]], [point[1]])
+
+class PointCloudAligner(DeferredRedrawMixin):
     def __init__(self, root, kf, pc, floor_img, slam_path):
         self.root = root
         self.kf = kf
         self.pc = pc
+        # Most map points land on the same screen pixels, so plot and warp a strided subset;
+        # self.pc keeps the full cloud
+        self.pc_display = None
+        if pc is not None:
+            # Ceiling division, so the subset never exceeds MAX_DISPLAY_POINTS
+            stride = max(1, -(-len(pc) // MAX_DISPLAY_POINTS))
+            self.pc_display = np.ascontiguousarray(pc[::stride])
         self.floor_img = floor_img
         self.slam_path = slam_path
 
-        self.kf_points = []
-        self.floor_points = []
+        # Correspondences live in the first n_corr rows of preallocated buffers that double when full
+        self.n_corr = 0
+        self.kf_points = np.empty((16, 2))
+        self.floor_points = np.empty((16, 2))
 
         self.selected_kf_point = None
         self.selected_floor_point = None
 
+        # (src, weights) of the last TPS fit; cleared whenever correspondences change
+        self._tps_cache = None
+
         self.status_var = tk.StringVar()
 
         self.fig, (self.ax_top, self.ax_bottom) = plt.subplots(2, 1, figsize=(8, 8))
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         self.canvas.mpl_connect("button_press_event", self.on_click)
+        self.canvas.mpl_connect("draw_event", self.on_draw)
 
         button_frame = tk.Frame(root)
         button_frame.pack(pady=5)
@@ -69,88 +59,136 @@ class PointCloudAligner:
         tk.Button(button_frame, text="Save Correspondences", command=self.save_correspondences, font=("Helvetica", 14), width=25, height=2).pack(side=tk.LEFT, padx=10)
 
         tk.Label(root, textvariable=self.status_var, fg="blue", font=("Helvetica", 12)).pack(pady=4)
-        
+
+        # Saved axes backgrounds for blitting; refreshed by on_draw after every full draw
+        self._bg_top = None
+        self._bg_bottom = None
+        self.init_artists()
+        self.canvas.draw()
+
         self.load_correspondences()
         self.redraw()
 
+    def init_artists(self):
+        # Static content (trajectory, map points, floor plan) is rendered once into the
+        # background; everything that changes per click is animated and blitted on top.
+        self.ax_top.set_title("Point Cloud and Trajectory")
+        self.ax_top.plot(self.kf[:, 0], self.kf[:, 1], 'r.-', label='Keyframes')
+        if self.pc_display is not None:
+            self.ax_top.scatter(self.pc_display[:, 0], self.pc_display[:, 1], s=1, c='blue', alpha=0.3, label='Map Points')
+        self._selected_kf_artist, = self.ax_top.plot([], [], 'ko', markersize=10, animated=True)
+        self.ax_top.set_aspect('equal')
+        self.ax_top.legend()
+
+        self.ax_bottom.set_title("Floor Plan + TPS Aligned")
+        self.ax_bottom.imshow(self.floor_img, cmap='gray', origin='upper')
+        self._floor_points_artist, = self.ax_bottom.plot([], [], 'go', markersize=5, animated=True)
+        self._aligned_kf_artist, = self.ax_bottom.plot([], [], 'r.-', label='Aligned Keyframes', animated=True)
+        self._aligned_pc_artist = self.ax_bottom.scatter([], [], s=1, c='blue', alpha=0.3, label='Aligned Map Points', animated=True)
+        self._selected_floor_artist, = self.ax_bottom.plot([], [], 'ko', markersize=10, animated=True)
+        self.ax_bottom.set_xlim([0, self.floor_img.shape[1]])
+        self.ax_bottom.set_ylim([self.floor_img.shape[0], 0])
+        self.ax_bottom.set_aspect('equal')
+        self.ax_bottom.legend()
+
+    def on_draw(self, event):
+        # A full draw means the layout or limits may have changed, so re-grab the backgrounds
+        self._bg_top = self.canvas.copy_from_bbox(self.ax_top.bbox)
+        self._bg_bottom = self.canvas.copy_from_bbox(self.ax_bottom.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        self.ax_top.draw_artist(self._selected_kf_artist)
+        self.ax_bottom.draw_artist(self._floor_points_artist)
+        self.ax_bottom.draw_artist(self._aligned_kf_artist)
+        self.ax_bottom.draw_artist(self._aligned_pc_artist)
+        self.ax_bottom.draw_artist(self._selected_floor_artist)
+
     def on_click(self, event):
         if event.inaxes == self.ax_top:
             self.selected_kf_point = np.array([event.xdata, event.ydata])
         elif event.inaxes == self.ax_bottom:
             self.selected_floor_point = np.array([event.xdata, event.ydata])
-        self.redraw()
+        self.schedule_redraw()
 
     def load_correspondences(self):
         path = os.path.join(self.slam_path, f"correspondences.txt")
-        if not os.path.exists(path):
+        # An empty file would make loadtxt warn and return (0, 0); there is nothing to load either way
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
             return
-        with open(path, 'r') as f:
-            for line in f:
-                kx, ky, fx, fy = map(float, line.strip().split())
-                self.kf_points.append(np.array([kx, ky]))
-                self.floor_points.append(np.array([fx, fy]))
-        self.status_var.set(f"Loaded {len(self.kf_points)} correspondences.")
+        data = np.loadtxt(path, ndmin=2)
+        self.n_corr = len(data)
+        capacity = max(16, 2 * self.n_corr)
+        self.kf_points = np.empty((capacity, 2))
+        self.floor_points = np.empty((capacity, 2))
+        self.kf_points[:self.n_corr] = data[:, :2]
+        self.floor_points[:self.n_corr] = data[:, 2:4]
+        self._tps_cache = None
+        self.status_var.set(f"Loaded {self.n_corr} correspondences.")
 
     def add_correspondence(self):
         if self.selected_kf_point is not None and self.selected_floor_point is not None:
-            self.kf_points.append(self.selected_kf_point)
-            self.floor_points.append(self.selected_floor_point)
+            if self.n_corr == len(self.kf_points):
+                self.kf_points = np.resize(self.kf_points, (2 * self.n_corr, 2))
+                self.floor_points = np.resize(self.floor_points, (2 * self.n_corr, 2))
+            self.kf_points[self.n_corr] = self.selected_kf_point
+            self.floor_points[self.n_corr] = self.selected_floor_point
+            self.n_corr += 1
             self.selected_kf_point = None
             self.selected_floor_point = None
-            self.status_var.set(f"Added correspondence. Total: {len(self.kf_points)}")
+            self._tps_cache = None
+            self.status_var.set(f"Added correspondence. Total: {self.n_corr}")
             self.redraw()
 
     def remove_last_correspondence(self):
-        if self.kf_points:
-            self.kf_points.pop()
-            self.floor_points.pop()
-            self.status_var.set(f"Removed last correspondence. Total: {len(self.kf_points)}")
+        if self.n_corr:
+            self.n_corr -= 1
+            self._tps_cache = None
+            self.status_var.set(f"Removed last correspondence. Total: {self.n_corr}")
             self.redraw()
     
     def save_correspondences(self):
-        if not self.kf_points or not self.floor_points:
+        if not self.n_corr:
             self.status_var.set("Nothing to save.")
             return
         save_path = os.path.join(self.slam_path, f"correspondences.txt")
         with open(save_path, 'w') as f:
-            for kf_pt, fl_pt in zip(self.kf_points, self.floor_points):
+            for kf_pt, fl_pt in zip(self.kf_points[:self.n_corr], self.floor_points[:self.n_corr]):
                 f.write(f"{kf_pt[0]} {kf_pt[1]} {fl_pt[0]} {fl_pt[1]}\n")
-        self.status_var.set(f"Saved {len(self.kf_points)} correspondences.")
+        self.status_var.set(f"Saved {self.n_corr} correspondences.")
 
     def redraw(self):
-        self.ax_top.clear()
-        self.ax_top.set_title("Point Cloud and Trajectory")
-        self.ax_top.plot(self.kf[:, 0], self.kf[:, 1], 'r.-', label='Keyframes')
-        if self.pc is not None:
-            self.ax_top.scatter(self.pc[:, 0], self.pc[:, 1], s=1, c='blue', alpha=0.3, label='Map Points')
-        if self.selected_kf_point is not None:
-            self.ax_top.plot(self.selected_kf_point[0], self.selected_kf_point[1], 'ko', markersize=10, label='Selected')
-        self.ax_top.set_aspect('equal')
-        self.ax_top.legend()
-
-        self.ax_bottom.clear()
-        self.ax_bottom.set_title("Floor Plan + TPS Aligned")
-        self.ax_bottom.imshow(self.floor_img, cmap='gray', origin='upper')
-        self.ax_bottom.set_xlim([0, self.floor_img.shape[1]])
-        self.ax_bottom.set_ylim([self.floor_img.shape[0], 0])
-
-        for pt in self.floor_points:
-            self.ax_bottom.plot(pt[0], pt[1], 'go', markersize=5)
-        if len(self.kf_points) >= 4:
-            src = np.array(self.kf_points)
-            dst = np.array(self.floor_points)
-            fx = Rbf(src[:, 0], src[:, 1], dst[:, 0], function='thin_plate')
-            fy = Rbf(src[:, 0], src[:, 1], dst[:, 1], function='thin_plate')
-            aligned_kf = np.stack([fx(self.kf[:, 0], self.kf[:, 1]), fy(self.kf[:, 0], self.kf[:, 1])], axis=1)
-            self.ax_bottom.plot(aligned_kf[:, 0], aligned_kf[:, 1], 'r.-', label='Aligned Keyframes')
-            if self.pc is not None:
-                aligned_pc = np.stack([fx(self.pc[:, 0], self.pc[:, 1]), fy(self.pc[:, 0], self.pc[:, 1])], axis=1)
-                self.ax_bottom.scatter(aligned_pc[:, 0], aligned_pc[:, 1], s=1, c='blue', alpha=0.3, label='Aligned Map Points')
-            self.ax_bottom.legend()
-        if self.selected_floor_point is not None:
-            self.ax_bottom.plot(self.selected_floor_point[0], self.selected_floor_point[1], 'ko', markersize=10, label='Selected')
-        self.ax_bottom.set_aspect('equal')
-        self.canvas.draw()
+        set_point(self._selected_kf_artist, self.selected_kf_point)
+        set_point(self._selected_floor_artist, self.selected_floor_point)
+        floor = self.floor_points[:self.n_corr]
+        self._floor_points_artist.set_data(floor[:, 0], floor[:, 1])
+
+        aligned_kf = np.empty((0, 2))
+        aligned_pc = np.empty((0, 2))
+        if self.n_corr >= 4:
+            if self._tps_cache is None:
+                src = self.kf_points[:self.n_corr].copy()
+                try:
+                    self._tps_cache = (src, fit_tps(src, self.floor_points[:self.n_corr]))
+                except np.linalg.LinAlgError as e:
+                    # Leave the warp empty but keep blitting, so the selection markers still update
+                    self.status_var.set(f"Cannot fit TPS ({e}). Remove or add a correspondence.")
+            if self._tps_cache is not None:
+                src, weights = self._tps_cache
+                aligned_kf = eval_tps(self.kf, src, weights)
+                if self.pc_display is not None:
+                    aligned_pc = eval_tps(self.pc_display, src, weights)
+        self._aligned_kf_artist.set_data(aligned_kf[:, 0], aligned_kf[:, 1])
+        self._aligned_pc_artist.set_offsets(aligned_pc)
+
+        if self._bg_top is None or self._bg_bottom is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._bg_top)
+        self.canvas.restore_region(self._bg_bottom)
+        self.draw_animated()
+        self.canvas.blit(self.ax_top.bbox)
+        self.canvas.blit(self.ax_bottom.bbox)
 
 # ======= Main launcher using real files ======= #
 def main():
@@ -171,7 +209,7 @@ def main():
     img = mpimg.imread(img_path)
     kf = load_keyframes(kf_path)
     pc = load_map_points(map_path) if os.path.exists(map_path) else None
-    kf_2d, pc_2d = project_to_plane(kf, pc)
+    kf_2d, pc_2d = project_to_plane(kf, pc, flip_y=True)
 
     root = tk.Tk()
     root.title("Point Cloud TPS Alignment GUI")
@@ -2,46 +2,26 @@ import os
 import argparse
 import numpy as np
 import tkinter as tk
-from PIL import Image, ImageTk
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from sklearn.decomposition import PCA
-from scipy.interpolate import Rbf
-
-# ========= Loaders ========= #
-def load_keyframes(path):
-    kf = []
-    with open(path, 'r') as f:
-        for line in f:
-            if line.strip() == "" or line.startswith("#"):
-                continue
-            parts = line.strip().split()
-            tx, ty, tz = float(parts[1]), float(parts[2]), float(parts[3])
-            kf.append([tx, ty, tz])
-    return np.array(kf)
-
-def load_map_points(path):
-    points = []
-    with open(path, 'r') as f:
-        for line in f:
-            if line.strip() == "" or line.startswith("pos_x"):
-                continue
-            parts = line.strip().replace(",", " ").split()
-            x, y, z = float(parts[0]), float(parts[1]), float(parts[2])
-            points.append([x, y, z])
-    return np.array(points)
-
-def project_to_plane(trajectory, pointcloud):
-    all_points = np.vstack([trajectory, pointcloud])
-    pca = PCA(n_components=2)
-    pca.fit(all_points)
-    traj_2d = pca.transform(trajectory)
-    pc_2d = pca.transform(pointcloud)
-    return traj_2d, pc_2d
+from io_utils import load_keyframes, load_map_points, project_to_plane
+from tps import fit_tps, eval_tps
+from gui_utils import DeferredRedrawMixin
+
+# ========= Affine helpers ========= #
+def apply_affine(points, A):
+    return points @ A[:2, :2].T.astype(points.dtype) + A[:2, 2].astype(points.dtype)
+
+def about_center(M, center):
+    # 3x3 affine applying the 2x2 linear map M about center
+    T = np.eye(3)
+    T[:2, :2] = M
+    T[:2, 2] = center - M @ center
+    return T
 
 # ========= Main GUI Class ========= #
-class AlignmentGUI:
+class AlignmentGUI(DeferredRedrawMixin):
     def __init__(self, root, floorplan_img, keyframe_positions, point_cloud=None):
         self.root = root
         self.root.title("Alignment Tool")
@@ -55,10 +35,24 @@ class AlignmentGUI:
         self.deform_start = None
         self.control_src = []
         self.control_dst = []
-
-        self.img_rgb = (floorplan_img * 255).astype(np.uint8) if floorplan_img.max() <= 1.0 else floorplan_img
+        # Move/rotate/zoom only update this transform from self.kf/self.pc to screen coordinates;
+        # the points themselves are rewritten once, when a TPS warp bakes the transform in
+        self._affine = np.eye(3)
+        # Mean of the untransformed keyframes; the affine maps it to the on-screen centroid
+        self._kf_mean = None
+
+        # mpimg.imread gives uint8 for JPEGs and 0..1 floats for PNGs; convert the latter in a single pass
+        if floorplan_img.dtype == np.uint8:
+            self.img_rgb = floorplan_img
+        else:
+            self.img_rgb = np.empty(floorplan_img.shape, dtype=np.uint8)
+            np.multiply(floorplan_img, 255, out=self.img_rgb, casting='unsafe')
         self.fig, self.ax = plt.subplots()
         self.canvas = FigureCanvasTkAgg(self.fig, master=root)
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+        # Saved floor plan background for blitting; refreshed by on_draw after every full draw
+        self._bg = None
+        self.init_artists()
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
@@ -76,10 +70,51 @@ class AlignmentGUI:
 
         self.redraw()
 
+    def init_artists(self):
+        # The floor plan is drawn once; keyframes and map points are persistent animated
+        # artists whose data is swapped in redraw() instead of being re-created.
+        self.ax.imshow(self.img_rgb, cmap='gray')
+        self._kf_artist, = self.ax.plot([], [], 'r.-', label="Keyframes", animated=True)
+        self._pc_artist = self.ax.scatter([], [], s=1, c='blue', alpha=0.3, label="Map Points", animated=True)
+        self.ax.set_aspect('equal')
+        self.ax.legend()
+
+    def on_draw(self, event):
+        self._bg = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        self.ax.draw_artist(self._kf_artist)
+        if self.pc is not None:
+            self.ax.draw_artist(self._pc_artist)
+
+    def fit_view(self, kf, pc):
+        # Keep the floor plan and every point in view, as the old clear-and-autoscale redraw did.
+        # Returns True if the limits changed, which invalidates the saved background.
+        h, w = self.img_rgb.shape[:2]
+        lo = np.minimum(kf.min(axis=0), [-0.5, -0.5])
+        hi = np.maximum(kf.max(axis=0), [w - 0.5, h - 0.5])
+        if pc is not None and len(pc):
+            lo = np.minimum(lo, pc.min(axis=0))
+            hi = np.maximum(hi, pc.max(axis=0))
+        xlim = (lo[0], hi[0])
+        ylim = (hi[1], lo[1])
+        if np.allclose(self.ax.get_xlim(), xlim) and np.allclose(self.ax.get_ylim(), ylim):
+            return False
+        self.ax.set_xlim(xlim)
+        self.ax.set_ylim(ylim)
+        return True
+
     def set_mode(self, mode):
         self.mode = mode
         print(f"🟢 {mode.capitalize()} mode enabled")
 
+    def kf_center(self):
+        # Affine maps commute with the mean, so the on-screen centroid never needs a pass over the points
+        if self._kf_mean is None:
+            self._kf_mean = self.kf.mean(axis=0, dtype=np.float64)
+        return self._affine[:2, :2] @ self._kf_mean + self._affine[:2, 2]
+
     def on_mouse_press(self, event):
         if self.mode in ['move', 'rotate', 'deform'] and event.xdata is not None and event.ydata is not None:
             self.last_mouse_pos = np.array([event.xdata, event.ydata])
@@ -92,8 +127,15 @@ class AlignmentGUI:
             self.control_src.append(self.deform_start)
             self.control_dst.append(deform_end)
             print(f"Added deform pair: {self.deform_start} → {deform_end}")
-            if len(self.control_src) >= 3:
-                self.apply_tps_deformation()
+            # With only three pairs the TPS is a pure affine map, which nearly collinear drags blow up
+            if len(self.control_src) >= 4:
+                try:
+                    self.apply_tps_deformation()
+                except np.linalg.LinAlgError as e:
+                    # Drop the pair that made the fit degenerate so the next drag starts from a usable set
+                    self.control_src.pop()
+                    self.control_dst.pop()
+                    print(f"Deform pair rejected ({e}); drag somewhere off the line of the other pairs")
             self.deform_start = None
         self.last_mouse_pos = None
 
@@ -103,58 +145,53 @@ class AlignmentGUI:
             delta = curr_mouse_pos - self.last_mouse_pos
 
             if self.mode == 'move':
-                self.kf += delta
-                if self.pc is not None:
-                    self.pc += delta
+                self._affine[:2, 2] += delta
             elif self.mode == 'rotate':
-                center = np.mean(self.kf, axis=0)
+                center = self.kf_center()
                 v1 = self.last_mouse_pos - center
                 v2 = curr_mouse_pos - center
                 angle = np.arctan2(v2[1], v2[0]) - np.arctan2(v1[1], v1[0])
                 R = np.array([[np.cos(angle), -np.sin(angle)],
                               [np.sin(angle),  np.cos(angle)]])
-                self.kf = (self.kf - center) @ R.T + center
-                if self.pc is not None:
-                    self.pc = (self.pc - center) @ R.T + center
+                self._affine = about_center(R, center) @ self._affine
 
             self.last_mouse_pos = curr_mouse_pos
-            self.redraw()
+            self.schedule_redraw()
 
     def on_scroll(self, event):
         if self.mode == 'zoom':
             zoom = 1.1 if event.step > 0 else 0.9
-            center = np.mean(self.kf, axis=0)
-            self.kf = (self.kf - center) * zoom + center
-            if self.pc is not None:
-                self.pc = (self.pc - center) * zoom + center
-            self.redraw()
+            center = self.kf_center()
+            self._affine = about_center(zoom * np.eye(2), center) @ self._affine
+            self.schedule_redraw()
 
     def apply_tps_deformation(self):
         print("Applying TPS with", len(self.control_src), "pairs")
         src = np.array(self.control_src)
         dst = np.array(self.control_dst)
 
-        def warp(points):
-            x, y = points[:, 0], points[:, 1]
-            fx = Rbf(src[:, 0], src[:, 1], dst[:, 0], function='thin_plate')
-            fy = Rbf(src[:, 0], src[:, 1], dst[:, 1], function='thin_plate')
-            return np.stack([fx(x, y), fy(x, y)], axis=1)
+        weights = fit_tps(src, dst)
 
-        self.kf = warp(self.kf)
+        # Control points were picked on screen, so bake the pending move/rotate/zoom in first
+        self.kf = eval_tps(apply_affine(self.kf, self._affine), src, weights)
         if self.pc is not None:
-            self.pc = warp(self.pc)
+            self.pc = eval_tps(apply_affine(self.pc, self._affine), src, weights)
+        self._affine = np.eye(3)
+        self._kf_mean = None
         self.redraw()
 
     def redraw(self):
-        self.ax.clear()
-        self.ax.imshow(self.img_rgb, cmap='gray')
-        self.ax.plot(self.kf[:, 0], self.kf[:, 1], 'r.-', label="Keyframes")
-        if self.pc is not None:
-            self.ax.scatter(self.pc[:, 0], self.pc[:, 1], s=1, c='blue', alpha=0.3, label="Map Points")
-        self.ax.set_aspect('equal')
-        self.ax.legend()
-        self.canvas.draw()
-        self.canvas.flush_events()
+        kf = apply_affine(self.kf, self._affine)
+        pc = apply_affine(self.pc, self._affine) if self.pc is not None else None
+        self._kf_artist.set_data(kf[:, 0], kf[:, 1])
+        if pc is not None:
+            self._pc_artist.set_offsets(pc)
+        if self.fit_view(kf, pc) or self._bg is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._bg)
+        self.draw_animated()
+        self.canvas.blit(self.ax.bbox)
 
 # ========= Main ========= #
 def main():
@@ -0,0 +1,14 @@
+class DeferredRedrawMixin:
+    # Mouse events can arrive faster than we can render; coalesce them into one redraw once Tk is idle.
+    # The host class provides self.root and redraw().
+    _redraw_pending = False
+
+    def schedule_redraw(self):
+        if self._redraw_pending:
+            return
+        self._redraw_pending = True
+        self.root.after_idle(self.run_scheduled_redraw)
+
+    def run_scheduled_redraw(self):
+        self._redraw_pending = False
+        self.redraw()
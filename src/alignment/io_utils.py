@@ -0,0 +1,95 @@
+import io
+import os
+import re
+import functools
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# Only project_to_plane needs scikit-learn, so the loaders work without it
+try:
+    from sklearn import __version__ as sklearn_version
+    from sklearn.decomposition import PCA
+    from sklearn.utils.fixes import parse_version
+except ImportError:
+    PCA = None
+
+# svd_solver='covariance_eigh' was added in scikit-learn 1.5; compare the release so 1.5 pre-releases count
+HAS_COVARIANCE_EIGH = PCA is not None and parse_version(sklearn_version).release >= (1, 5)
+
+# ========= Loaders ========= #
+# '#' comments, whole-line (indented or not) or trailing a row
+COMMENT_RE = re.compile(rb'[ \t]*#.*')
+
+def read_data(path):
+    # Raw file contents with comments, surrounding blank space and the leading "pos_x, ..." header
+    # that some map point files start with removed; both map point parsers work from this buffer
+    with open(path, 'rb') as f:
+        data = f.read()
+    if b'#' in data:
+        data = COMMENT_RE.sub(b'', data)
+    data = data.strip()
+    if data.startswith(b'pos_x'):
+        data = data.partition(b'\n')[2].strip()
+    return data
+
+def read_table(path, empty_cols=0):
+    # Bulk-parse a comma- or space-separated numeric table in one np.fromstring call.
+    # The column count comes from the first data row; empty_cols is only the width returned for
+    # empty or header-only files, so callers can still slice columns.
+    data = read_data(path).replace(b',', b' ')
+    if not data:
+        return np.empty((0, empty_cols), dtype=np.float32)
+    n_cols = len(data.split(b'\n', 1)[0].split())
+    return np.fromstring(data, dtype=np.float32, sep=' ').reshape(-1, n_cols)
+
+def load_keyframes(path):
+    return np.ascontiguousarray(read_table(path, empty_cols=4)[:, 1:4])
+
+def load_map_points(path):
+    # Keyed on mtime as well so an edited file is re-read rather than served stale
+    return load_map_points_cached(os.path.abspath(path), os.path.getmtime(path))
+
+@functools.lru_cache(maxsize=8)
+def load_map_points_cached(path, mtime):
+    # Map points are comma- or space-separated, optionally with a "pos_x, ..." header
+    if pd is None:
+        points = np.ascontiguousarray(read_table(path, empty_cols=3)[:, :3])
+    else:
+        data = read_data(path)
+        if not data:
+            # pandas would raise EmptyDataError; return the same shape as read_table
+            points = np.empty((0, 3), dtype=np.float32)
+        else:
+            # pandas' C parser is much faster than loadtxt on large clouds
+            sep = ',' if b',' in data.partition(b'\n')[0] else r'\s+'
+            df = pd.read_csv(io.BytesIO(data), sep=sep, skipinitialspace=True, header=None, usecols=[0, 1, 2], engine='c')
+            points = df.to_numpy(dtype=np.float32)
+    # The same array is handed to every caller, so keep it from being modified in place
+    points.flags.writeable = False
+    return points
+
+# ========= Projection ========= #
+def project_to_plane(trajectory, pointcloud, flip_y=False):
+    if PCA is None:
+        raise ImportError("project_to_plane needs scikit-learn")
+    # Points are float32; fit in float64 so the decomposition keeps full precision
+    all_points = np.vstack([trajectory, pointcloud], dtype=np.float64)
+    # Every caller passes N x 3 keyframes/map points, so only the first branch runs today;
+    # the randomized branch is untested and only there for wider inputs
+    if all_points.shape[1] <= 8:
+        # Few features: form the small covariance matrix and eigendecompose it
+        pca = PCA(n_components=2, svd_solver='covariance_eigh' if HAS_COVARIANCE_EIGH else 'full')
+    else:
+        # Many features: randomized SVD only computes the two components we keep
+        pca = PCA(n_components=2, svd_solver='randomized', iterated_power=4, random_state=0)
+    pca.fit(all_points)
+    traj_2d = pca.transform(trajectory).astype(np.float32)
+    pc_2d = pca.transform(pointcloud).astype(np.float32)
+    if flip_y:
+        traj_2d[:, 1] *= -1
+        pc_2d[:, 1] *= -1
+    return traj_2d, pc_2d
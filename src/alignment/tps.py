@@ -0,0 +1,68 @@
+import numpy as np
+from scipy.spatial.distance import cdist
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# ========= Thin-plate spline ========= #
+# Smallest allowed ratio of the controls' spread across their best-fit line to their spread along it.
+# Below this the affine term is barely determined and points away from the line are flung far off.
+MIN_SPREAD_RATIO = 0.05
+
+def tps_kernel(d2):
+    # U(r) = r^2 log r written in terms of d2 = r^2, with U(0) = 0
+    return 0.5 * d2 * np.log(np.where(d2 > 0, d2, 1.0))
+
+def fit_tps(src, dst):
+    # Solve x and y together: one factorization of the (N+3)x(N+3) system, two RHS columns
+    n = len(src)
+    # Reject collinear or nearly collinear controls up front instead of returning a wild affine part
+    spread = np.linalg.svd(src - src.mean(axis=0), compute_uv=False) if n >= 3 else np.zeros(2)
+    if spread[1] <= MIN_SPREAD_RATIO * spread[0]:
+        raise np.linalg.LinAlgError("TPS control points are collinear or nearly so")
+    P = np.hstack([np.ones((n, 1)), src])
+    A = np.zeros((n + 3, n + 3))
+    A[:n, :n] = tps_kernel(cdist(src, src, 'sqeuclidean'))
+    A[:n, n:] = P
+    A[n:, :n] = P.T
+    b = np.zeros((n + 3, 2))
+    b[:n] = dst
+    return np.linalg.solve(A, b)
+
+def eval_tps(query, src, weights):
+    if njit is not None:
+        return eval_tps_jit(np.ascontiguousarray(query), src.astype(query.dtype), weights.astype(query.dtype))
+    # [U(|q - s|) | 1 | q] @ W gives both output coordinates from one distance matrix and one GEMM
+    # The fit stays float64 for conditioning; the evaluation runs in the query's precision
+    n = len(src)
+    phi = np.empty((len(query), n + 3), dtype=query.dtype)
+    phi[:, :n] = tps_kernel(cdist(query, src, 'sqeuclidean'))
+    phi[:, n] = 1.0
+    phi[:, n + 1:] = query
+    return phi @ weights.astype(query.dtype)
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def eval_tps_jit(query, src, weights):
+        # Same result as the NumPy path, but never materializes the M x N basis matrix
+        m = query.shape[0]
+        n = src.shape[0]
+        out = np.empty((m, 2), dtype=query.dtype)
+        for i in prange(m):
+            qx = query[i, 0]
+            qy = query[i, 1]
+            ox = weights[n, 0] + qx * weights[n + 1, 0] + qy * weights[n + 2, 0]
+            oy = weights[n, 1] + qx * weights[n + 1, 1] + qy * weights[n + 2, 1]
+            for j in range(n):
+                dx = qx - src[j, 0]
+                dy = qy - src[j, 1]
+                d2 = dx * dx + dy * dy
+                if d2 > 0.0:
+                    phi = 0.5 * d2 * np.log(d2)
+                    ox += phi * weights[j, 0]
+                    oy += phi * weights[j, 1]
+            out[i, 0] = ox
+            out[i, 1] = oy
+        return out
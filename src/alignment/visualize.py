@@ -2,36 +2,43 @@ import os
 import numpy as np
 import matplotlib.pyplot as plt
 import argparse
+from io_utils import load_keyframes, load_map_points
 
-def load_trajectory(file_path):
-    data = []
-    with open(file_path, 'r') as f:
-        for line in f:
-            if line.strip() == "" or line.startswith("#"):
-                continue
-            parts = line.strip().split()
-            tx, ty, tz = map(float, parts[1:4])
-            data.append([tx, ty, tz])
-    return np.array(data)
+try:
+    import open3d as o3d
+except ImportError:
+    o3d = None
+
+# mplot3d depth-sorts every marker on each redraw, so cap how many map points it has to handle
+MAX_MPL_POINTS = 50000
 
 def load_point_cloud(file_path):
     if not os.path.exists(file_path):
         print(f"[Warning] Point cloud file not found: {file_path}")
         return None
-    data = []
-    with open(file_path, 'r') as f:
-        for line in f:
-            if line.strip() == "" or line.startswith("pos_x"):
-                continue
-            parts = line.strip().replace(',', ' ').split()
-            x, y, z = map(float, parts)
-            data.append([x, y, z])
-    return np.array(data)
+    return load_map_points(file_path)
+
+def trajectory_lineset(traj, color):
+    lineset = o3d.geometry.LineSet()
+    lineset.points = o3d.utility.Vector3dVector(traj.astype(np.float64))
+    lineset.lines = o3d.utility.Vector2iVector(np.column_stack([np.arange(len(traj) - 1), np.arange(1, len(traj))]).astype(np.int32))
+    lineset.paint_uniform_color(color)
+    return lineset
+
+def show_open3d(kf_traj, f_traj, point_cloud, title):
+    geometries = [trajectory_lineset(f_traj, [0.5, 0.5, 0.5]), trajectory_lineset(kf_traj, [1.0, 0.0, 0.0])]
+    if point_cloud is not None:
+        pcd = o3d.geometry.PointCloud()
+        pcd.points = o3d.utility.Vector3dVector(point_cloud.astype(np.float64))
+        pcd.paint_uniform_color([0.0, 0.0, 1.0])
+        geometries.append(pcd)
+    o3d.visualization.draw_geometries(geometries, window_name=title)
 
 def main():
     parser = argparse.ArgumentParser(description="Visualize ORB-SLAM trajectory and point cloud.")
     parser.add_argument("--floor", type=str, required=True, help="Floor name (e.g., FRB2)")
     parser.add_argument("--ref", action='store_true', help="Use reference map points instead of raw map points")
+    parser.add_argument("--engine", choices=["matplotlib", "open3d"], default="matplotlib", help="Renderer; open3d draws the full cloud on the GPU")
     args = parser.parse_args()
 
     floor = args.floor
@@ -49,9 +56,16 @@ def main():
         print(f"  {f_file}")
         return
 
-    kf_traj = load_trajectory(kf_file)
-    f_traj = load_trajectory(f_file)
+    kf_traj = load_keyframes(kf_file)
+    f_traj = load_keyframes(f_file)
     point_cloud = load_point_cloud(pc_file)
+    title = f"ORB-SLAM Trajectory + Map Points ({'Ref' if args.ref else 'Raw'}) - {floor}"
+
+    if args.engine == "open3d":
+        if o3d is not None:
+            show_open3d(kf_traj, f_traj, point_cloud, title)
+            return
+        print("[Warning] open3d is not installed, falling back to matplotlib")
 
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
@@ -60,10 +74,12 @@ def main():
     ax.plot(kf_traj[:, 0], kf_traj[:, 1], kf_traj[:, 2], 'r.-', label="Keyframes")
 
     if point_cloud is not None:
-        ax.scatter(point_cloud[:, 0], point_cloud[:, 1], point_cloud[:, 2],
-                   s=1, c='blue', label="Map Points", alpha=0.6)
+        # Ceiling division, so at most MAX_MPL_POINTS reach mplot3d
+        shown = point_cloud[::max(1, -(-len(point_cloud) // MAX_MPL_POINTS))]
+        ax.scatter(shown[:, 0], shown[:, 1], shown[:, 2],
+                   s=1, c='blue', label="Map Points", alpha=0.6, depthshade=False)
 
-    ax.set_title(f"ORB-SLAM Trajectory + Map Points ({'Ref' if args.ref else 'Raw'}) - {floor}")
+    ax.set_title(title)
     ax.set_xlabel("X")
     ax.set_ylabel("Y")
     ax.set_zlabel("Z")
@@ -1,6 +1,11 @@
+import os
 import cv2
 import numpy as np
 import glob
+from concurrent.futures import ThreadPoolExecutor
+
+# Height in pixels of each detection thumbnail in the summary mosaic
+THUMB_HEIGHT = 160
 
 # Define checkerboard dimensions
 CHECKERBOARD = (11, 8)  # (Columns, Rows)
@@ -16,30 +21,49 @@ imgpoints = []  # 2D points in image plane
 # Load all images
 images = glob.glob('/home/kevinbee/Dev/calibration_images/*.jpg')  # Change path if needed
 
-for fname in images:
-    img = cv2.imread(fname)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+def detect_corners(fname):
+    # Load straight to grayscale; the summary thumbnail is drawn from it too
+    gray = cv2.imread(fname, cv2.IMREAD_GRAYSCALE)
+    # Find the checkerboard corners with the sector-based detector (more robust to blur/lighting)
+    flags = cv2.CALIB_CB_EXHAUSTIVE | cv2.CALIB_CB_NORMALIZE_IMAGE
+    ret, corners = cv2.findChessboardCornersSB(gray, CHECKERBOARD, flags=flags)
+    thumb = None
+    if ret:
+        scale = THUMB_HEIGHT / gray.shape[0]
+        thumb = cv2.cvtColor(cv2.resize(gray, (round(gray.shape[1] * scale), THUMB_HEIGHT)), cv2.COLOR_GRAY2BGR)
+        cv2.drawChessboardCorners(thumb, CHECKERBOARD, corners * scale, True)
+    return ret, corners, gray.shape[::-1], thumb
+
+def make_mosaic(tiles, cols):
+    rows = -(-len(tiles) // cols)
+    tiles = tiles + [np.zeros_like(tiles[0])] * (rows * cols - len(tiles))
+    return np.concatenate([np.concatenate(tiles[r * cols:(r + 1) * cols], axis=1) for r in range(rows)], axis=0)
 
-    # Find the checkerboard corners
-    ret, corners = cv2.findChessboardCorners(gray, CHECKERBOARD, None)
+# Detect corners in parallel (OpenCV releases the GIL), then collect results in order
+with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+    results = list(executor.map(detect_corners, images))
 
+tiles = []
+for fname, (ret, corners, image_size, thumb) in zip(images, results):
     if ret:
         objpoints.append(objp)
         imgpoints.append(corners)
-
-        # Draw and display corners
-        cv2.drawChessboardCorners(img, CHECKERBOARD, corners, ret)
-        cv2.imshow('Corners', img)
-        cv2.waitKey(500)
-
-cv2.destroyAllWindows()
+        tiles.append(thumb)
 
 # Perform calibration
-ret, camera_matrix, dist_coeffs, rvecs, tvecs = cv2.calibrateCamera(objpoints, imgpoints, gray.shape[::-1], None, None)
+ret, camera_matrix, dist_coeffs, rvecs, tvecs = cv2.calibrateCamera(objpoints, imgpoints, image_size, None, None)
 
 print("Camera Matrix:\n", camera_matrix)
 print("Distortion Coefficients:\n", dist_coeffs)
 
+# Show every detection once as a single mosaic instead of pausing on each image
+if tiles:
+    # Pick the column count that makes the mosaic roughly square
+    cols = int(np.ceil(np.sqrt(len(tiles) * tiles[0].shape[0] / tiles[0].shape[1])))
+    cv2.imshow('Corners', make_mosaic(tiles, cols))
+    cv2.waitKey(0)
+    cv2.destroyAllWindows()
+
 # # Save to file
 # np.save("camera_matrix.npy", camera_matrix)
 # np.save("dist_coeffs.npy", dist_coeffs)
\ No newline at end of file